@@ -23,6 +23,9 @@ assert SIZE_LONG == 8
 assert SIZE_FLOAT == 4
 assert SIZE_DOUBLE == 8
 
+# How much read_nullstr() reads at a time from regular files.
+NULLSTR_CHUNK = 256
+
 
 def struct_read(fmt: Union[Struct, str], file: IO[bytes]) -> tuple:
     """Read a structure from the file."""
@@ -38,6 +41,20 @@ def read_nullstr(file: IO[bytes], pos: int=None, encoding: str = 'ascii') -> str
             return ''
         file.seek(pos)
 
+    if file.seekable():
+        # Read in chunks, then seek back to just after the terminator.
+        chunks: List[bytes] = []
+        while True:
+            chunk = file.read(NULLSTR_CHUNK)
+            end = chunk.find(b'\0')
+            if end != -1:
+                chunks.append(chunk[:end])
+                file.seek(end + 1 - len(chunk), 1)
+                return b''.join(chunks).decode(encoding)
+            if not chunk:
+                raise ValueError('Fell off end of file!')
+            chunks.append(chunk)
+
     text: List[bytes] = []
     while True:
         char = file.read(1)
@@ -1,23 +1,25 @@
 """Parses Source models, to extract metadata."""
 from typing import (
     Union, Iterator, Iterable,
-    List, Dict, Tuple, cast,
+    List, Dict, Set, Tuple, Optional, cast,
     BinaryIO, Sequence as SequenceType,
 )
+from contextlib import contextmanager
 from enum import IntFlag, Enum
+from operator import itemgetter
 from pathlib import PurePosixPath
+import mmap
 import attr
 
 from srctools import Property
-from srctools.binformat import (
-    struct_read, read_nullstr, read_offset_array,
-    str_readvec,
-)
+import srctools.logger
 from srctools.filesys import FileSystem, File
 from srctools.math import Vec
 from struct import Struct
 
 
+LOGGER = srctools.logger.get_logger(__name__)
+
 # All the file extensions used for models.
 MDL_EXTS: SequenceType[str] = [
     '.mdl',
@@ -75,6 +77,9 @@ class AnimEvents(Enum):
     3000 - 4999 is weapon events.
     5000+       is clientside events.
     """
+    # Members are singletons, so hash by identity. Enum's default hashes the
+    # name in Python code, which makes set/dict membership tests much slower.
+    __hash__ = object.__hash__
 
     # New string-based type (eventlist.h)
     AE_EMPTY = 0
@@ -269,16 +274,131 @@ ANIM_EVENT_BY_NAME = {
 }  # type: Dict[str, AnimEvents]
 
 ST_PHY_HEADER = Struct('<iiil')
+# The size of each collision solid, preceding its data.
+ST_PHY_SOLID_SIZE = Struct('<i')
+
+# The main studiohdr_t structure, split into sections.
+ST_MDL_HEADER = Struct('<i 4s 64s i')
+ST_MDL_HEADER_VECS = Struct('<18f')
+ST_MDL_HEADER_BONES = Struct('<11I')
+ST_MDL_HEADER_TEXTURES = Struct('<13i')
+ST_MDL_HEADER_FLEXES = Struct('<15I')
+ST_MDL_HEADER_SURFACEPROP = Struct('<5I')
+ST_MDL_HEADER_INCLUDES = Struct('<f 11I')
+ST_MDL_HEADER_LOD = Struct('<3b 5x 2I')
+# VDC:
+# For anyone trying to follow along, as of this writing,
+# the next "surfaceprop_index" value is at position 0x0134 (308)
+# from the start of the file.
+# The sections are fixed-size, so check this once here, not per model.
+assert 4 + sum(st.size for st in [
+    ST_MDL_HEADER, ST_MDL_HEADER_VECS, ST_MDL_HEADER_BONES,
+    ST_MDL_HEADER_TEXTURES, ST_MDL_HEADER_FLEXES,
+]) == 308, 'Header sections are the wrong size!'
+# An array of offsets to strings.
+ST_OFFSET = Struct('<i')
+# mstudiotexture_t
+ST_TEXTURE = Struct('<iii 4x 8x 40x')
+# mstudiomodelgroup_t
+ST_INCLUDED_MDL = Struct('<II')
+# mstudioseqdesc_t, up to the keyvalues. We skip the blend/animation data
+# (20 ints, 9 floats), then 8 unused ints at the end.
+ST_SEQ_HEADER = Struct('<8i 3f 3f 116x ii 32x')
+# mstudioevent_t
+ST_SEQ_EVENT = Struct('<fii64si')
+# mstudiobodyparts_t, mstudiomodel_t, mstudiomesh_t
+ST_BODYPART = Struct('<iiii')
+ST_BODY_MODEL = Struct('<64s i f 9i 8x 32x')
+# Of the mesh we only need the material - the other 8 ints, the
+# center vector and the trailing data are all skipped.
+ST_MESH = Struct('<i 112x')
+
+
+@contextmanager
+def _map_file(f: BinaryIO) -> Iterator[bytes]:
+    """Memory-map the file if possible, otherwise read it all into memory.
+
+    Large models are mostly animation data we never look at, so this avoids
+    copying all of that. Mapping always starts from the beginning of the
+    file, so it's only done if the stream is positioned there.
+    """
+    mapping: Optional[mmap.mmap] = None
+    try:
+        fileno = f.fileno()
+        at_start = f.tell() == 0
+    except (OSError, AttributeError):  # In-memory or archive files.
+        at_start = False
+    if at_start:
+        try:
+            mapping = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):  # Empty files can't be mapped.
+            pass
+    if mapping is None:
+        yield f.read()
+    else:
+        with mapping:
+            yield cast(bytes, mapping)
 
 
-@attr.define
+def _nullstr(data: bytes, pos: int) -> str:
+    """Read a null-terminated string from the given position in the data."""
+    end = data.find(b'\0', pos)
+    if end == -1:
+        raise ValueError('Fell off end of file!')
+    return data[pos:end].decode('ascii')
+
+
+def _vmt_filename(tex: str) -> Optional[str]:
+    """Normalise a texture name like PurePosixPath, and give it a .vmt suffix.
+
+    If it's absolute or empty, joining it onto a folder isn't a simple
+    concatenation, so None is returned.
+    """
+    if tex.startswith('/'):
+        return None
+    # Drop empty and '.' segments, like PurePosixPath does.
+    tex = '/'.join([part for part in tex.split('/') if part and part != '.'])
+    if not tex:
+        return None
+    # Replace any extension, like PurePosixPath.with_suffix().
+    dot = tex.rfind('.')
+    if dot > tex.rfind('/') + 1 and dot != len(tex) - 1:
+        tex = tex[:dot]
+    return tex + '.vmt'
+
+
+def _vmt_filenames(textures: Iterable[str]) -> Tuple[Set[str], Set[str]]:
+    """Convert textures to .vmt filenames for iter_textures().
+
+    This returns the filenames, and any textures _vmt_filename() can't handle.
+    """
+    filenames: Set[str] = set()
+    unusual: Set[str] = set()
+    for tex in textures:
+        filename = _vmt_filename(tex)
+        if filename is None:
+            unusual.add(tex)
+        else:
+            filenames.add(filename)
+    return filenames, unusual
+
+
+def _normalize_cdmat(path: str) -> str:
+    """Convert a $cdmaterials folder to forward slashes, with a trailing one."""
+    path = path.replace('\\', '/').lstrip('/')
+    if path and path[-1] != '/':
+        path += '/'
+    return path
+
+
+@attr.define(weakref_slot=False)
 class IncludedMDL:
     """Additional model files to load animations from."""
     label: str
     filename: str
 
 
-@attr.define
+@attr.define(weakref_slot=False)
 class SeqEvent:
     """An event that occurs at some point in an animation sequence."""
     # AnimEvents for known common ones, str for dynamic NPC-specific events.
@@ -287,7 +407,7 @@ class SeqEvent:
     options: str  # Additional event-specific data.
 
 
-@attr.define
+@attr.define(weakref_slot=False)
 class Sequence:
     """An animation sequence."""
     label: str
@@ -305,7 +425,19 @@ class Model:
     """Represents parts of Source models.
 
     This does not parse the animation or geometry data, only other metadata.
+    Models use slots, so other attributes can't be added to them.
     """
+    __slots__ = [
+        '_file', '_sys',
+        'version', 'flags', 'checksum', 'name', 'phys_keyvalues',
+        'eye_pos', 'illum_pos', 'hull_min', 'hull_max', 'view_min', 'view_max',
+        'mass', 'contents', 'numAllowedRootLods',
+        'cdmaterials', 'skins', 'surfaceprop', 'keyvalues', 'included_models',
+        'sequences',
+        # Allow models to still be weakly referenced.
+        '__weakref__',
+    ]
+
     def __init__(self, filesystem: FileSystem, file: File):
         """Parse a model from a file."""
         self._file = file
@@ -314,8 +446,11 @@ class Model:
         self.checksum = b'\0\0\0\0'
 
         self.phys_keyvalues = Property.root()
-        with self._file.open_bin() as f:
-            self._load(f)
+        # Models are fully indexed by offsets, so map or read the whole
+        # thing and parse out of the buffer. That way it doesn't matter if
+        # the filesystem's stream is buffered or not.
+        with self._file.open_bin() as f, _map_file(f) as data:
+            self._load(data)
 
         path = PurePosixPath(file.path)
         try:
@@ -326,30 +461,36 @@ class Model:
             with phy_file.open_bin() as f:
                 self._parse_phy(f, phy_file.path)
 
-    def _load(self, f: BinaryIO) -> None:
+    def _load(self, data: bytes) -> None:
         """Read data from the MDL file."""
-        assert f.tell() == 0, "Doesn't begin at start?"
-        if f.read(4) != b'IDST':
+        if data[:4] != b'IDST':
             raise ValueError('Not a model!')
         (
             self.version,
             self.checksum,
             name,
             file_len,
-        ) = struct_read('i 4s 64s i', f)
+        ) = ST_MDL_HEADER.unpack_from(data, 4)
+        off = 4 + ST_MDL_HEADER.size
 
         if not 44 <= self.version <= 49:
             raise ValueError('Unknown MDL version {}!'.format(self.version))
 
-        self.name = name.rstrip(b'\0').decode('ascii')
-        self.eye_pos = str_readvec(f)
-        self.illum_pos = str_readvec(f)
-        # Approx dimensions
-        self.hull_min = str_readvec(f)
-        self.hull_max = str_readvec(f)
-
-        self.view_min = str_readvec(f)
-        self.view_max = str_readvec(f)
+        self.name = name.partition(b'\0')[0].decode('ascii')
+        vec_data = ST_MDL_HEADER_VECS.unpack_from(data, off)
+        [
+            self.eye_pos,
+            self.illum_pos,
+            # Approx dimensions
+            self.hull_min,
+            self.hull_max,
+            self.view_min,
+            self.view_max,
+        ] = [
+            Vec(vec_data[i:i + 3])
+            for i in range(0, 18, 3)
+        ]
+        off += ST_MDL_HEADER_VECS.size
 
         # Break up the reading a bit to limit the stack size.
         (
@@ -363,7 +504,8 @@ class Model:
             hitbox_count, hitbox_off,
             anim_count, anim_off,
             sequence_count, sequence_off,
-        ) = struct_read('<11I', f)
+        ) = ST_MDL_HEADER_BONES.unpack_from(data, off)
+        off += ST_MDL_HEADER_BONES.size
 
         self.flags = Flags(flags)
 
@@ -380,7 +522,8 @@ class Model:
             # The number of $body in the model (mstudiobodyparts_t).
             bodypart_count, bodypart_offset,
             attachment_count, attachment_offset,
-        ) = struct_read('<13i', f)
+        ) = ST_MDL_HEADER_TEXTURES.unpack_from(data, off)
+        off += ST_MDL_HEADER_TEXTURES.size
 
         (
             localnode_count,
@@ -413,13 +556,8 @@ class Model:
             # mstudioposeparamdesc_t
             localposeparam_count,
             localposeparam_index,
-        ) = struct_read('<15I', f)
-
-        # VDC:
-        # For anyone trying to follow along, as of this writing,
-        # the next "surfaceprop_index" value is at position 0x0134 (308)
-        # from the start of the file.
-        assert f.tell() == 308, 'Offset wrong? {} != 308 {}'.format(f.tell(), f)
+        ) = ST_MDL_HEADER_FLEXES.unpack_from(data, off)
+        off += ST_MDL_HEADER_FLEXES.size
 
         (
             # Surface property value (single null-terminated string)
@@ -435,7 +573,8 @@ class Model:
             # mstudioiklock_t
             iklock_count,
             iklock_index,
-        ) = struct_read('<5I', f)
+        ) = ST_MDL_HEADER_SURFACEPROP.unpack_from(data, off)
+        off += ST_MDL_HEADER_SURFACEPROP.size
 
         (
             self.mass,  # Mass of object (float)
@@ -464,7 +603,8 @@ class Model:
 
             vertex_base,  # Placeholder for void*
             offset_base,  # Placeholder for void*
-        ) = struct_read('<f 11I', f)
+        ) = ST_MDL_HEADER_INCLUDES.unpack_from(data, off)
+        off += ST_MDL_HEADER_INCLUDES.size
 
         (
             # Used with $constantdirectionallight from the QC
@@ -483,175 +623,158 @@ class Model:
             # mstudioflexcontrollerui_t
             flexcontrollerui_count,
             flexcontrollerui_index,
-        ) = struct_read('3b 5x 2I', f)
+        ) = ST_MDL_HEADER_LOD.unpack_from(data, off)
 
         # Build CDMaterials data
-        f.seek(cdmat_offset)
-        self.cdmaterials = read_offset_array(f, cdmat_count)
-
-        for ind, cdmat in enumerate(self.cdmaterials):
-            cdmat = cdmat.replace('\\', '/').lstrip('/')
-            if cdmat and cdmat[-1:] != '/':
-                cdmat += '/'
-            self.cdmaterials[ind] = cdmat
+        cdmat_table = data[cdmat_offset:cdmat_offset + cdmat_count * ST_OFFSET.size]
+        self.cdmaterials = [
+            _normalize_cdmat(_nullstr(data, pos)) if pos else ''
+            for [pos] in ST_OFFSET.iter_unpack(cdmat_table)
+        ]
 
         # Build texture data
-        f.seek(texture_offset)
-        textures: List[Tuple[str, int, int]] = [None] * texture_count
-        tex_temp: List[Tuple[int, Tuple[int, int, int]]] = [None] * texture_count
-        for tex_ind in range(texture_count):
-            tex_temp[tex_ind] = (
-                f.tell(),
-                # Texture data:
-                # int: offset to the string, from start of struct.
-                # int: flags - appears to solely indicate 'teeth' materials...
-                # int: used, whatever that means.
-                # 4 unused bytes.
-                # 2 4-byte pointers in studiomdl to the material class, for
-                #      server and client - shouldn't be in the file...
-                # 40 bytes of unused space (for expansion...)
-                cast('Tuple[int, int, int]', struct_read('iii 4x 8x 40x', f)),
-            )
-        for tex_ind, (offset, data) in enumerate(tex_temp):
-            name_offset, flags, used = data
-            textures[tex_ind] = (
-                read_nullstr(f, offset + name_offset),
+        # Texture data:
+        # int: offset to the string, from start of struct.
+        # int: flags - appears to solely indicate 'teeth' materials...
+        # int: used, whatever that means.
+        # 4 unused bytes.
+        # 2 4-byte pointers in studiomdl to the material class, for
+        #      server and client - shouldn't be in the file...
+        # 40 bytes of unused space (for expansion...)
+        tex_table = data[texture_offset:texture_offset + texture_count * ST_TEXTURE.size]
+        textures: List[Tuple[str, int, int]] = [
+            (
+                _nullstr(data, texture_offset + tex_ind * ST_TEXTURE.size + name_offset),
                 flags,
                 used,
             )
+            for tex_ind, (name_offset, flags, used)
+            in enumerate(ST_TEXTURE.iter_unpack(tex_table))
+        ]
 
         # Now parse through the family table, to match skins to textures.
-        f.seek(skinref_ind)
-        ref_data = f.read(2 * skinref_count * skin_count)
-        self.skins = [None] * skin_count  # type: List[List[str]]
-        skin_group = Struct('<{}H'.format(skinref_count))
-        offset = 0
-        for ind in range(skin_count):
-            self.skins[ind] = [
-                textures[i][0].replace('\\', '/').lstrip('/')
-                for i in skin_group.unpack_from(ref_data, offset)
-            ]
-            offset += skin_group.size
+        # Normalise each texture once, since they're shared between skins.
+        tex_names = [tex.replace('\\', '/').lstrip('/') for tex, flags, used in textures]
+        if skin_count and skinref_count:
+            skin_refs = Struct('<{}H'.format(skinref_count * skin_count)).unpack_from(data, skinref_ind)
+        else:  # No table at all, don't bother compiling a struct.
+            skin_refs = ()
+        self.skins: List[List[str]] = [
+            [tex_names[i] for i in skin_refs[ind * skinref_count: (ind + 1) * skinref_count]]
+            for ind in range(skin_count)
+        ]
 
         # If models have folders, add those folders onto cdmaterials.
-        for tex, flags, used in textures:
-            tex = tex.replace('\\', '/')
+        # Include the trailing slash, so these match the existing entries.
+        cdmat_set = set(self.cdmaterials)
+        for tex in tex_names:
             if '/' in tex:
-                folder = tex.rsplit('/', 1)[0]
-                if folder not in self.cdmaterials:
+                folder = tex.rsplit('/', 1)[0] + '/'
+                if folder not in cdmat_set:
+                    cdmat_set.add(folder)
                     self.cdmaterials.append(folder)
 
         # All models fallback to checking the texture at a root folder.
-        if '' not in self.cdmaterials:
+        if '' not in cdmat_set:
             self.cdmaterials.append('')
 
-        f.seek(surfaceprop_index)
-        self.surfaceprop = read_nullstr(f)
+        self.surfaceprop = _nullstr(data, surfaceprop_index)
 
-        if keyvalue_count:
-            self.keyvalues = read_nullstr(f, keyvalue_index)
+        if keyvalue_count and keyvalue_index:
+            self.keyvalues = _nullstr(data, keyvalue_index)
         else:
             self.keyvalues = ''
 
-        f.seek(includemodel_index)
-        self.included_models = [None] * includemodel_count  # type: List[IncludedMDL]
-        for i in range(includemodel_count):
-            pos = f.tell()
-            # This is two offsets from the start of the structures.
-            lbl_pos, filename_pos = struct_read('II', f)
-            self.included_models[i] = IncludedMDL(
-                read_nullstr(f, pos + lbl_pos) if lbl_pos else '',
-                read_nullstr(f, pos + filename_pos) if filename_pos else '',
-            )
-            # Then return to after that struct - 4 bytes * 2.
-            f.seek(pos + 4 * 2)
+        # This is two offsets from the start of each structure.
+        include_table = data[
+            includemodel_index:
+            includemodel_index + includemodel_count * ST_INCLUDED_MDL.size
+        ]
+        self.included_models: List[IncludedMDL] = []
+        for i, (lbl_pos, filename_pos) in enumerate(ST_INCLUDED_MDL.iter_unpack(include_table)):
+            pos = includemodel_index + i * ST_INCLUDED_MDL.size
+            self.included_models.append(IncludedMDL(
+                _nullstr(data, pos + lbl_pos) if lbl_pos else '',
+                _nullstr(data, pos + filename_pos) if filename_pos else '',
+            ))
 
-        f.seek(sequence_off)
-        self.sequences = self._read_sequences(f, sequence_count)
+        self.sequences: List[Sequence] = self._read_sequences(data, sequence_off, sequence_count)
 
-        f.seek(bodypart_offset)
-        self._cull_skins_table(f, bodypart_count)
+        self._cull_skins_table(data, bodypart_offset, bodypart_count)
 
     @staticmethod
-    def _read_sequences(f: BinaryIO, count: int) -> List[Sequence]:
+    def _read_sequences(data: bytes, off: int, count: int) -> List[Sequence]:
         """Split this off to decrease stack in main parse method."""
+        seq_table = data[off:off + count * ST_SEQ_HEADER.size]
         sequences: List[Sequence] = [cast(Sequence, None)] * count
-        for i in range(count):
-            start_pos = f.tell()
-            (
-                base_ptr,
-                label_pos,
-                act_name_pos,
-                flags,
-                _,  # Seems to be a pointer.
-                act_weight,
-                event_count,
-                event_pos,
-            ) = struct_read('8i', f)
-            bbox_min = str_readvec(f)
-            bbox_max = str_readvec(f)
-
-            # Skip 20 ints, 9 floats to get to keyvalues = 29*4 bytes
-            # Then 8 unused ints.
-            (
-                keyvalue_pos,
-                keyvalue_size,
-            ) = struct_read('116xii32x', f)
-            end_pos = f.tell()
-
-            f.seek(start_pos + event_pos)
-            events: List[SeqEvent] = [cast(SeqEvent, None)] * event_count
-            for j in range(event_count):
-                event_start = f.tell()
-                (
-                    event_cycle,
-                    event_index,
-                    event_flags,
-                    event_options,
-                    event_nameloc,
-                ) = struct_read('fii64si', f)
-                event_end = f.tell()
+        for i, (
+            base_ptr,
+            label_pos,
+            act_name_pos,
+            flags,
+            _,  # Seems to be a pointer.
+            act_weight,
+            event_count,
+            event_pos,
+            min_x, min_y, min_z,
+            max_x, max_y, max_z,
+            keyvalue_pos,
+            keyvalue_size,
+        ) in enumerate(ST_SEQ_HEADER.iter_unpack(seq_table)):
+            start_pos = off + i * ST_SEQ_HEADER.size
+            bbox_min = Vec(min_x, min_y, min_z)
+            bbox_max = Vec(max_x, max_y, max_z)
+
+            # The events are a contiguous array, decode all in one go.
+            event_start = start_pos + event_pos
+            event_table = data[event_start:event_start + event_count * ST_SEQ_EVENT.size]
+            # Unknown events are skipped, so this can't be preallocated.
+            events: List[SeqEvent] = []
+            for j, (
+                event_cycle,
+                event_index,
+                event_flags,
+                event_options,
+                event_nameloc,
+            ) in enumerate(ST_SEQ_EVENT.iter_unpack(event_table)):
 
                 # There are two event systems.
-                event_type: Union[AnimEvents, str]
+                event_type: Union[AnimEvents, str, None]
                 if event_flags == 1 << 10:
                     # New system, name in the file.
-                    event_name = read_nullstr(f, event_start + event_nameloc)
-                    if event_name.isdigit():
-                        try:
-                            event_type = ANIM_EVENT_BY_INDEX[int(event_name)]
-                        except KeyError:
-                            raise ValueError('Unknown event index!')
-                    else:
-                        try:
-                            event_type = ANIM_EVENT_BY_NAME[event_name]
-                        except KeyError:
+                    event_name = _nullstr(data, event_start + j * ST_SEQ_EVENT.size + event_nameloc)
+                    event_type = ANIM_EVENT_BY_NAME.get(event_name)
+                    if event_type is None:
+                        if event_name.isdigit():
+                            event_type = ANIM_EVENT_BY_INDEX.get(int(event_name))
+                            if event_type is None:
+                                LOGGER.debug('Unknown event index {}: {!r}', event_name, event_options.partition(b'\0')[0])
+                                continue
+                        else:
                             # NPC-specific events, declared dynamically.
                             event_type = event_name
                 else:
                     # Old system, index.
-                    try:
-                        event_type = ANIM_EVENT_BY_INDEX[event_index]
-                    except KeyError:
+                    event_type = ANIM_EVENT_BY_INDEX.get(event_index)
+                    if event_type is None:
                         # raise ValueError('Unknown event index!')
-                        print('Unknown: ', event_index, event_options.rstrip(b'\0'))
+                        LOGGER.debug('Unknown event index {}: {!r}', event_index, event_options.partition(b'\0')[0])
                         continue
 
-                f.seek(event_end)
-                events[j] = SeqEvent(
+                events.append(SeqEvent(
                     type=event_type,
                     cycle=event_cycle,
-                    options=event_options.rstrip(b'\0').decode('ascii')
-                )
+                    options=event_options.partition(b'\0')[0].decode('ascii', 'replace')
+                ))
 
             if keyvalue_size:
-                keyvalues = read_nullstr(f, start_pos + keyvalue_pos)
+                keyvalues = _nullstr(data, start_pos + keyvalue_pos)
             else:
                 keyvalues = ''
 
             sequences[i] = Sequence(
-                label=read_nullstr(f, start_pos + label_pos),
-                act_name=read_nullstr(f, start_pos + act_name_pos),
+                label=_nullstr(data, start_pos + label_pos),
+                act_name=_nullstr(data, start_pos + act_name_pos),
                 flags=flags,
                 act_weight=act_weight,
                 events=events,
@@ -660,11 +783,9 @@ class Model:
                 keyvalues=keyvalues,
             )
 
-            f.seek(end_pos)
-
         return sequences
 
-    def _cull_skins_table(self, f: BinaryIO, body_count: int) -> None:
+    def _cull_skins_table(self, data: bytes, off: int, body_count: int) -> None:
         """Fix the table of used skins to correspond to those actually used.
 
         StudioMDL is rather messy, and adds many extra columns that are not used
@@ -675,18 +796,17 @@ class Model:
 
         # Iterate through bodygroups.
         for body_ind in range(body_count):
-            body_start = f.tell()
+            body_start = off
             (
                 body_name_off,  # Offset to find the bodygroup name
                 model_count,  # Number of models in this group
                 base,  # Unknown
                 model_off,
-            ) = struct_read('iiii', f)
-            body_end = f.tell()
+            ) = ST_BODYPART.unpack_from(data, body_start)
+            off += ST_BODYPART.size
 
-            f.seek(body_start + model_off)
+            model_start = body_start + model_off
             for model_ind in range(model_count):
-                model_start = f.tell()
                 (
                     mdl_name,
                     mdl_type,
@@ -702,35 +822,25 @@ class Model:
                     eyeball_ind,
                     # Two void* pointers,
                     # 32 empty bytes
-                ) = struct_read('64s i f 9i 8x 32x', f)
-                model_end = f.tell()
-
-                f.seek(model_start + mesh_off)
-                for mesh_ind in range(mesh_count):
-                    (
-                        material,
-                        mesh_model_ind,
-                        mesh_vert_count,
-                        mesh_vert_off,
-                        mesh_flex_count,
-                        mesh_flex_ind,
-                        mesh_mat_type,
-                        mesh_mat_param,
-                        mesh_id,
-                        mesh_cent_x,
-                        mesh_cent_y,
-                        mesh_cent_z,
-                        # Void pointer
-                        # Array of LOD vertex counts ints, 8 of them
-                        # 8 unused int spaces.
-                    ) = struct_read('9i 3f 4x 32x 32x', f)
-                    used_inds.add(material)
-
-                f.seek(model_end)
-            f.seek(body_end)
-
-        for skin_ind, tex in enumerate(self.skins):
-            self.skins[skin_ind] = [tex[i] for i in used_inds]
+                ) = ST_BODY_MODEL.unpack_from(data, model_start)
+
+                # mstudiomesh_t: the material index, then a bunch of data
+                # we don't need - model index, vertex counts and offsets,
+                # flexes, material type/param, ID, the center, a void pointer,
+                # LOD vertex counts and unused space.
+                mesh_start = model_start + mesh_off
+                mesh_table = data[mesh_start:mesh_start + mesh_count * ST_MESH.size]
+                used_inds.update(mat for [mat] in ST_MESH.iter_unpack(mesh_table))
+
+                model_start += ST_BODY_MODEL.size
+
+        used_list = sorted(used_inds)
+        if len(used_list) > 1:
+            # Pull out all the columns at once.
+            getter = itemgetter(*used_list)
+            self.skins = [list(getter(tex)) for tex in self.skins]
+        else:  # itemgetter() would return a single value, or require one.
+            self.skins = [[tex[i] for i in used_list] for tex in self.skins]
 
     def _parse_phy(self, f: BinaryIO, filename: str) -> None:
         """Parse the physics data file, if present.
@@ -741,12 +851,23 @@ class Model:
             solid_count,
             checksum,
         ] = ST_PHY_HEADER.unpack(f.read(ST_PHY_HEADER.size))
-        f.read(size - ST_PHY_HEADER.size)  # If the header is larger ever.
+        # We don't need the solid data, so seek over it if possible instead
+        # of reading it into memory.
+        seekable = f.seekable()
+        if size > ST_PHY_HEADER.size:  # If the header is larger ever.
+            if seekable:
+                f.seek(size - ST_PHY_HEADER.size, 1)
+            else:
+                f.read(size - ST_PHY_HEADER.size)
         for solid in range(solid_count):
-            [solid_size] = struct_read('i', f)
-            f.read(solid_size)  # Skip the header.
+            [solid_size] = ST_PHY_SOLID_SIZE.unpack(f.read(ST_PHY_SOLID_SIZE.size))
+            if seekable:
+                f.seek(solid_size, 1)
+            else:
+                f.read(solid_size)
+        # The keyvalues are the remainder of the file.
         self.phys_keyvalues = Property.parse(
-            read_nullstr(f),
+            _nullstr(f.read(), 0),
             filename + ":keyvalues",
             allow_escapes=False,
             single_line=True,
@@ -761,23 +882,37 @@ class Model:
         """
 
         if skins:
-            paths = set()
+            textures = set()
             for ind in skins:
                 try:
-                    paths.update(self.skins[ind])
+                    textures.update(self.skins[ind])
                 except IndexError:
                     # Default to skin 0.
-                    paths.update(self.skins[0])
+                    textures.update(self.skins[0])
         else:
-            paths = {
+            textures = {
                 tex
                 for texgroup in self.skins
                 for tex in texgroup
             }
-
-        for tex in paths:
+        filenames, unusual = _vmt_filenames(textures)
+
+        # Build the folder portion of the paths once, normalised the same
+        # way as the filenames.
+        prefixes = []
+        for folder in self.cdmaterials:
+            prefix = str(PurePosixPath('materials', folder))
+            prefixes.append(prefix if prefix.endswith('/') else prefix + '/')
+        fsys = self._sys
+        for tex in filenames:
+            for prefix in prefixes:
+                full = prefix + tex
+                if full in fsys:
+                    yield full
+                    break
+        for tex in unusual:
             for folder in self.cdmaterials:
                 full = str(PurePosixPath('materials', folder, tex).with_suffix('.vmt'))
-                if full in self._sys:
+                if full in fsys:
                     yield full
                     break
@@ -98,17 +98,24 @@ SCRIPT_FUNC_TYPES: Dict[bytes, Tuple[str, FileType]] = {
 }
 
 # Events which play sounds
-ANIM_EVENT_SOUND = {
+ANIM_EVENT_SOUND = frozenset({
     AnimEvents.AE_CL_PLAYSOUND,
     AnimEvents.AE_SV_PLAYSOUND,
     AnimEvents.SCRIPT_EVENT_SOUND,
     AnimEvents.SCRIPT_EVENT_SOUND_VOICE,
-}
+})
 # Events which play a hardcoded footstep.
-ANIM_EVENT_FOOTSTEP = {
+ANIM_EVENT_FOOTSTEP = frozenset({
     AnimEvents.AE_NPC_LEFTFOOT,
     AnimEvents.AE_NPC_RIGHTFOOT,
-}
+})
+# The soundscripts those footstep events use, appended to the NPC name.
+ANIM_EVENT_FOOTSTEP_SOUNDS = (
+    '.RunFootstepLeft',
+    '.RunFootstepRight',
+    '.FootstepLeft',
+    '.FootstepRight',
+)
 ANIM_EVENT_PARTICLE = AnimEvents.AE_CL_CREATE_PARTICLE_EFFECT
 
 
@@ -1096,10 +1103,8 @@ class PackList:
                     self.pack_soundscript(event.options)
                 elif event.type in ANIM_EVENT_FOOTSTEP:
                     npc = event.options or "NPC_CombineS"
-                    self.pack_soundscript(npc + ".RunFootstepLeft")
-                    self.pack_soundscript(npc + ".RunFootstepRight")
-                    self.pack_soundscript(npc + ".FootstepLeft")
-                    self.pack_soundscript(npc + ".FootstepRight")
+                    for suffix in ANIM_EVENT_FOOTSTEP_SOUNDS:
+                        self.pack_soundscript(npc + suffix)
                 elif event.type is ANIM_EVENT_PARTICLE:
                     try:
                         part_name, attach_type, attach_name = event.options.split()
@@ -17,6 +17,9 @@ __all__ = [
     'Mesh', 'Triangle', 'Vertex', 'Bone', 'BoneFrame', 'ParseError',
 ]
 
+# Equivalent to math.degrees(), without the function call per value.
+_RAD_TO_DEG = 180.0 / math.pi
+
 
 class _BinaryFile(Protocol):
     """The methods on files we use."""
@@ -410,7 +413,11 @@ class Mesh:
                 try:
                     byt_ind, byt_x, byt_y, byt_z, byt_pit, byt_yaw, byt_rol = line.split()
                     pos = Vec(float(byt_x), float(byt_y), float(byt_z))
-                    rot = Angle(math.degrees(float(byt_pit)), math.degrees(float(byt_yaw)), math.degrees(float(byt_rol)))
+                    rot = Angle(
+                        float(byt_pit) * _RAD_TO_DEG,
+                        float(byt_yaw) * _RAD_TO_DEG,
+                        float(byt_rol) * _RAD_TO_DEG,
+                    )
                 except ValueError:
                     raise ParseError(line_num, 'Invalid line!') from None
                 try:
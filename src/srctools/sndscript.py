@@ -1,13 +1,14 @@
 """Reads and writes Soundscripts."""
 from enum import Enum
 from chunk import Chunk as WAVChunk
+import warnings
 
 import attr
 
 from srctools import Property, conv_float
 from typing import (
-    Optional, Union, TypeVar, Callable,
-    List, Tuple, Dict,
+    Optional, Union, TypeVar, Mapping, Callable,
+    List, Tuple, Dict, Set,
     TextIO, IO,
 )
 
@@ -104,12 +105,28 @@ class Level(Enum):
         return self.name
 
 
+# The text constants permitted for each option, used by _split_float().
+# Keys are uppercase, since values are matched case-insensitively.
+_VOLUME_NAMES: Dict[str, VOLUME] = {vol.value: vol for vol in VOLUME}
+_PITCH_NAMES: Dict[str, Pitch] = {pitch.name: pitch for pitch in Pitch}
+_LEVEL_NAMES: Dict[str, Level] = {level.name.upper(): level for level in Level}
+# Channels are looked up directly, not via Channel() which is much slower.
+_CHANNEL_NAMES: Dict[str, Channel] = {chan.value: chan for chan in Channel}
+# The keyvalue options Sound.parse() reads from each sound.
+_SOUND_OPTIONS = frozenset({
+    'volume', 'pitch', 'soundlevel', 'attenuation',
+    'channel', 'soundentry_version',
+})
+
 EnumType = TypeVar('EnumType', bound=Enum)
 
 
 def split_float(
     val: str,
-    enum: Callable[[str], Union[float, EnumType]],
+    enum: Union[
+        Mapping[str, Union[float, EnumType]],
+        Callable[[str], Union[float, EnumType]],
+    ],
     default: Union[float, EnumType],
     name: str,
 ) -> Tuple[Union[float, EnumType], Union[float, EnumType]]:
@@ -117,9 +134,12 @@ def split_float(
 
     If single, low and high are the same.
     enum is a Enum with values to match text constants, or a converter function
-    returning enums or raising ValueError, KeyError or IndexError.
+    returning enums or raising ValueError, KeyError or IndexError. A mapping
+    from uppercase text constants to values can also be passed.
     The name is used for error handling.
     """
+    if isinstance(enum, Mapping):
+        return _split_float(val, enum, default, name)
     if isinstance(val, list):
         raise ValueError(f'Property block used for option in {name} sound!')
     if ',' in val:
@@ -141,13 +161,44 @@ def split_float(
         return out, out
 
 
+def _split_float(
+    val: str,
+    enum: Mapping[str, Union[float, EnumType]],
+    default: Union[float, EnumType],
+    name: str,
+) -> Tuple[Union[float, EnumType], Union[float, EnumType]]:
+    """Implement split_float() for a mapping of text constants.
+
+    This is used by Sound.parse(), since dict lookups are much faster than
+    catching exceptions from Enum lookups.
+    """
+    if isinstance(val, list):
+        raise ValueError(f'Property block used for option in {name} sound!')
+    s_low, sep, s_high = val.partition(',')
+    if sep:
+        if ',' in s_high:
+            raise ValueError(f'Too many values for option in {name} sound!')
+        low = enum.get(s_low.upper())
+        if low is None:
+            low = conv_float(s_low, default)
+        high = enum.get(s_high.upper())
+        if high is None:
+            high = conv_float(s_high, default)
+        return low, high
+    else:
+        out = enum.get(val.upper())
+        if out is None:
+            out = conv_float(val, default)
+        return out, out
+
+
 def join_float(val: Tuple[float, float]) -> str:
     """Reverse split_float()."""
     low, high = val
     if low == high:
         return str(low)
     else:
-        return '{!s},{!s}'.format(low, high)
+        return f'{low!s},{high!s}'
 
 
 def wav_is_looped(file: IO[bytes]) -> bool:
@@ -278,30 +329,58 @@ class Sound:
         """
         sounds = {}
         for snd_prop in file:
-            volume = split_float(
-                snd_prop['volume', '1'],
-                VOLUME,
+            # Sort out all the keys in one pass, instead of searching for each.
+            # Like Property[key], later values override earlier ones, and
+            # blocks are ignored.
+            options: Dict[str, str] = {}
+            # Every name present, including blocks.
+            present: Set[str] = set()
+            ignored_blocks: Set[str] = set()
+            # Either 1 "wave", or multiple in "rndwave".
+            wavs: List[str] = []
+            stack_blocks: List[Property] = []
+            for prop in snd_prop:
+                name = prop.name
+                present.add(name)
+                if name == 'wave':
+                    wavs.append(prop.value)
+                elif name == 'rndwave':
+                    for subprop in prop:
+                        wavs.append(subprop.value)
+                elif prop.has_children():
+                    if name == 'operator_stacks':
+                        stack_blocks.append(prop)
+                    elif name in _SOUND_OPTIONS:
+                        ignored_blocks.add(name)
+                else:
+                    options[name] = prop.value
+            if not ignored_blocks.issubset(options):
+                warnings.warn('This will ignore block properties!', DeprecationWarning, stacklevel=2)
+
+            volume = _split_float(
+                options.get('volume', '1'),
+                _VOLUME_NAMES,
                 1.0,
                 snd_prop.real_name,
             )
-            pitch = split_float(
-                snd_prop['pitch', '100'],
-                Pitch.__getitem__,
+            pitch = _split_float(
+                options.get('pitch', '100'),
+                _PITCH_NAMES,
                 100.0,
                 snd_prop.real_name,
             )
 
-            if 'soundlevel' in snd_prop:
-                level = split_float(
-                    snd_prop['soundlevel'],
-                    Level.__getitem__,
+            if 'soundlevel' in present:
+                level = _split_float(
+                    options['soundlevel'],
+                    _LEVEL_NAMES,
                     Level.SNDLVL_NORM,
                     snd_prop.real_name,
                 )
-            elif 'attenuation' in snd_prop:
-                atten_min, atten_max = split_float(
-                    snd_prop['attenuation'],
-                    ATTENUATION.__getitem__,
+            elif 'attenuation' in present:
+                atten_min, atten_max = _split_float(
+                    options['attenuation'],
+                    ATTENUATION,
                     ATTENUATION['ATTN_IDLE'],
                     snd_prop.real_name,
                 )
@@ -314,31 +393,41 @@ class Sound:
             else:
                 level = (Level.SNDLVL_NORM, Level.SNDLVL_NORM)
 
-            # Either 1 "wave", or multiple in "rndwave".
-            wavs: List[str] = []
-            for prop in snd_prop:
-                if prop.name == 'wave':
-                    wavs.append(prop.value)
-                elif prop.name == 'rndwave':
-                    for subprop in prop:
-                        wavs.append(subprop.value)
+            chan_name = options.get('channel', 'CHAN_AUTO')
+            try:
+                channel = _CHANNEL_NAMES[chan_name]
+            except KeyError:
+                raise ValueError(
+                    f'Unknown channel "{chan_name}" in "{snd_prop.real_name}"!'
+                ) from None
 
-            channel = Channel(snd_prop['channel', 'CHAN_AUTO'])
+            try:
+                sound_version = int(options.get('soundentry_version', 1))
+            except ValueError:
+                sound_version = 1
 
-            sound_version = snd_prop.int('soundentry_version', 1)
-
-            if 'operator_stacks' in snd_prop:
+            if 'operator_stacks' in present:
                 if sound_version == 1:
                     raise ValueError(
                         'Operator stacks used with version '
-                        'less than 2 in "{}"!'.format(snd_prop.real_name))
-
+                        f'less than 2 in "{snd_prop.real_name}"!')
+
+                # Sort the stacks in one pass, and only produce the ones
+                # which are actually used.
+                stacks: Dict[str, List[Property]] = {
+                    'start_stack': [],
+                    'update_stack': [],
+                    'stop_stack': [],
+                }
+                for stack_block in stack_blocks:
+                    for stack in stack_block:
+                        try:
+                            stack_props = stacks[stack.name]
+                        except KeyError:
+                            continue
+                        stack_props.extend(prop.copy() for prop in stack)
                 start_stack, update_stack, stop_stack = [
-                    Property(stack_name, [
-                        prop.copy()
-                        for prop in
-                        snd_prop.find_children('operator_stacks', stack_name)
-                    ])
+                    Property(stack_name, stacks[stack_name]) if stacks[stack_name] else None
                     for stack_name in
                     ['start_stack', 'update_stack', 'stop_stack']
                 ]
@@ -364,57 +453,47 @@ class Sound:
 
         Pass a file-like object open for text writing.
         """
-        file.write('"{}"\n\t{{\n'.format(self.name))
+        # Build up the whole sound, then write it in one go.
+        parts: List[str] = [f'"{self.name}"\n\t{{\n']
+        append = parts.append
 
-        file.write('\t' 'channel {}\n'.format(self.channel.value))
+        append(f'\tchannel {self.channel.value}\n')
 
-        file.write('\t' 'soundlevel {}\n'.format(join_float(self.level)))
+        append(f'\tsoundlevel {join_float(self.level)}\n')
 
         if self.volume != (1, 1):
-            file.write('\tvolume {}\n'.format(join_float(self.volume)))
+            append(f'\tvolume {join_float(self.volume)}\n')
         if self.pitch != (100, 100):
-            file.write('\tpitch {}\n'.format(join_float(self.pitch)))
+            append(f'\tpitch {join_float(self.pitch)}\n')
 
         if len(self.sounds) > 1:
-            file.write('\trndwave\n\t\t{\n')
+            append('\trndwave\n\t\t{\n')
             for wav in self.sounds:
-                file.write('\t\twave "{}"\n'.format(wav))
-            file.write('\t\t}\n')
+                append(f'\t\twave "{wav}"\n')
+            append('\t\t}\n')
         else:
-            file.write('\twave "{}"\n'.format(self.sounds[0]))
-
-        if self.force_v2 or self.stack_start or self.stack_stop or self.stack_update:
-            file.write(
+            append(f'\twave "{self.sounds[0]}"\n')
+
+        # Check the stacks directly, the properties would create blank ones.
+        stack_start = self._stack_start
+        stack_update = self._stack_update
+        stack_stop = self._stack_stop
+        if self.force_v2 or stack_start or stack_update or stack_stop:
+            append(
                 '\t' 'soundentry_version 2\n'
                 '\t' 'operator_stacks\n'
                 '\t\t' '{\n'
             )
-            if self.stack_start:
-                file.write(
-                    '\t\t' 'start_stack\n'
-                    '\t\t\t' '{\n'
-                )
-                for prop in self.stack_start:
-                    for line in prop.export():
-                        file.write('\t\t\t' + line)
-                file.write('\t\t\t}\n')
-            if self.stack_update:
-                file.write(
-                    '\t\t' 'update_stack\n'
-                    '\t\t\t' '{\n'
-                )
-                for prop in self.stack_update:
-                    for line in prop.export():
-                        file.write('\t\t\t' + line)
-                file.write('\t\t\t}\n')
-            if self.stack_stop:
-                file.write(
-                    '\t\t' 'stop_stack\n'
-                    '\t\t\t' '{\n'
-                )
-                for prop in self.stack_stop:
-                    for line in prop.export():
-                        file.write('\t\t\t' + line)
-                file.write('\t\t\t}\n')
-            file.write('\t\t}\n')
-        file.write('\t}\n')
+            for stack_name, stack in [
+                ('start_stack', stack_start),
+                ('update_stack', stack_update),
+                ('stop_stack', stack_stop),
+            ]:
+                if stack:
+                    append(f'\t\t{stack_name}\n\t\t\t{{\n')
+                    for prop in stack:
+                        parts.extend('\t\t\t' + line for line in prop.export())
+                    append('\t\t\t}\n')
+            append('\t\t}\n')
+        append('\t}\n')
+        file.write(''.join(parts))
@@ -0,0 +1,170 @@
+"""Generates the synthetic MDL and PHY files used by test_mdl.
+
+These only contain the sections srctools.mdl parses - the header, textures,
+skins, included models, sequences with their events, and the bodygroup/mesh
+tables used to cull the skins. Run from the tests folder.
+"""
+import os
+import struct
+
+
+class Buffer:
+    """Assembles a file, with the ability to fill in offsets later."""
+    def __init__(self) -> None:
+        self.data = bytearray()
+
+    def tell(self) -> int:
+        return len(self.data)
+
+    def add(self, data: bytes) -> int:
+        """Append data, returning the position it was written to."""
+        pos = len(self.data)
+        self.data += data
+        return pos
+
+    def patch(self, pos: int, fmt: str, *values) -> None:
+        """Overwrite previously written data."""
+        struct.pack_into('<' + fmt, self.data, pos, *values)
+
+    def string(self, text: str) -> int:
+        """Append a null-terminated string."""
+        return self.add(text.encode('ascii') + b'\0')
+
+
+CDMATERIALS = ['models\\props\\', '/models/other', 'models/third/', '']
+TEXTURES = [
+    'models\\props\\wood', 'metal.01', '/models/third/glass',
+    'brick', 'models/props/wood2', 'extra',
+]
+SKINS = [
+    [0, 1, 2, 3, 4, 5],
+    [4, 1, 0, 3, 2, 5],
+    [5, 5, 5, 3, 1, 0],
+]
+INCLUDES = [('', 'models/a.mdl'), ('lbl', 'models/b.mdl')]
+# label, activity, events, keyvalues.
+# Events are cycle, index, flags, options, name.
+SEQUENCES = [
+    ('idle', 'ACT_IDLE', [
+        (0.1, 14, 0, 'Snd.One', None),
+        (0.5, 0, 1 << 10, 'opt', 'AE_CL_CREATE_PARTICLE_EFFECT'),
+        (0.6, 0, 1 << 10, 'x', 'CUSTOM_EVENT'),
+        (0.7, 0, 1 << 10, 'y', '1004'),
+    ], 'kv1'),
+    ('walk', '', [
+        (0.2, 1, 0, 'Combine', None),
+        (0.25, 12345, 0, 'unknown', None),
+        (0.3, 2010, 0, 'swish', None),
+        (0.35, 0, 1 << 10, 'unknown', '99999'),
+    ], ''),
+    ('empty', 'ACT_X', [], ''),
+]
+# The materials used by each mesh, in each model, in each bodygroup.
+BODYGROUPS = [
+    [[0, 2], []],
+    [[3, 2, 0]],
+]
+
+
+def build_mdl() -> bytes:
+    """Build the MDL file."""
+    buf = Buffer()
+    buf.add(b'IDST')
+    buf.add(struct.pack('<i4s64si', 49, b'CHK1', b'models/test/thing.mdl\0garbage', 0))
+    buf.add(struct.pack('<18f', *[i * 0.5 for i in range(18)]))
+    hdr_bones = buf.add(bytes(44))
+    hdr_textures = buf.add(bytes(52))
+    buf.add(bytes(60))
+    assert buf.tell() == 308
+    hdr_surfprop = buf.add(bytes(20))
+    hdr_includes = buf.add(bytes(48))
+    buf.add(struct.pack('<3b5x2I', 1, 2, 3, 0, 0))
+    assert buf.tell() == 392
+
+    cdmat_off = buf.add(bytes(4 * len(CDMATERIALS)))
+    for i, folder in enumerate(CDMATERIALS):
+        buf.patch(cdmat_off + 4 * i, 'i', buf.string(folder))
+
+    tex_off = buf.add(bytes(64 * len(TEXTURES)))
+    for i, tex in enumerate(TEXTURES):
+        record = tex_off + 64 * i
+        buf.patch(record, 'iii', buf.string(tex) - record, i, i * 2)
+
+    skin_off = buf.add(struct.pack(
+        '<{}H'.format(len(SKINS) * len(TEXTURES)),
+        *[ind for skin in SKINS for ind in skin]
+    ))
+    surfaceprop = buf.string('metal')
+    keyvalues = buf.string('"prop_data" { "base" "Metal.Small" }')
+
+    inc_off = buf.add(bytes(8 * len(INCLUDES)))
+    for i, (label, filename) in enumerate(INCLUDES):
+        record = inc_off + 8 * i
+        buf.patch(
+            record, 'II',
+            (buf.string(label) - record) if label else 0,
+            buf.string(filename) - record,
+        )
+
+    seq_off = buf.add(bytes(212 * len(SEQUENCES)))
+    for i, (label, act, events, seq_kv) in enumerate(SEQUENCES):
+        record = seq_off + 212 * i
+        label_pos = buf.string(label) - record
+        act_pos = buf.string(act) - record
+        event_off = buf.add(bytes(80 * len(events)))
+        for j, (cycle, index, flags, options, name) in enumerate(events):
+            ev_record = event_off + 80 * j
+            name_pos = (buf.string(name) - ev_record) if name else 0
+            buf.patch(ev_record, 'fii64si', cycle, index, flags, options.encode('ascii'), name_pos)
+        kv_pos = (buf.string(seq_kv) - record) if seq_kv else 0
+        buf.patch(record, '8i', 0, label_pos, act_pos, i + 3, 0, i * 7, len(events), event_off - record)
+        buf.patch(record + 32, '6f', *[float(i + k) for k in range(6)])
+        buf.patch(record + 172, 'ii', kv_pos, len(seq_kv) + 1 if seq_kv else 0)
+
+    body_off = buf.add(bytes(16 * len(BODYGROUPS)))
+    for i, models in enumerate(BODYGROUPS):
+        body_record = body_off + 16 * i
+        model_off = buf.add(bytes(148 * len(models)))
+        for j, meshes in enumerate(models):
+            model_record = model_off + 148 * j
+            mesh_off = buf.tell()
+            for mat in meshes:
+                buf.add(struct.pack('<9i3f4x32x32x', mat, j, 0, 0, 0, 0, 0, 0, 0, 1.0, 2.0, 3.0))
+            buf.patch(
+                model_record, '64sif9i', b'mdl', 0, 1.0,
+                len(meshes), mesh_off - model_record, 0, 0, 0, 0, 0, 0, 0,
+            )
+        buf.patch(body_record, 'iiii', 0, len(models), 0, model_off - body_record)
+
+    # Flags are static_prop | autogenerated_hitbox.
+    buf.patch(hdr_bones, '11I', 0x11, 0, 0, 0, 0, 0, 0, 0, 0, len(SEQUENCES), seq_off)
+    buf.patch(
+        hdr_textures, '13i', 0, 0,
+        len(TEXTURES), tex_off,
+        len(CDMATERIALS), cdmat_off,
+        len(TEXTURES), len(SKINS), skin_off,
+        len(BODYGROUPS), body_off,
+        0, 0,
+    )
+    buf.patch(hdr_surfprop, '5I', surfaceprop, keyvalues, 1, 0, 0)
+    buf.patch(hdr_includes, 'f11I', 12.5, 3, len(INCLUDES), inc_off, 0, 0, 0, 0, 0, 0, 0, 0)
+    return bytes(buf.data)
+
+
+def build_phy() -> bytes:
+    """Build the PHY file, with a 4-byte larger header than usual."""
+    buf = Buffer()
+    buf.add(struct.pack('<iiil', 20, 0, 2, 1234))
+    buf.add(b'\xAA' * 4)
+    for size in [10, 30]:
+        buf.add(struct.pack('<i', size) + b'\x01' * size)
+    buf.add(b'solid { "index" "0" } break { "model" "models/gib.mdl" }\0')
+    return bytes(buf.data)
+
+
+if __name__ == '__main__':
+    os.makedirs('test_mdl/', exist_ok=True)
+    with open('test_mdl/synthetic.mdl', 'wb') as f:
+        f.write(build_mdl())
+    with open('test_mdl/synthetic.phy', 'wb') as f:
+        f.write(build_phy())
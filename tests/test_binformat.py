@@ -0,0 +1,100 @@
+"""Test the binary format helpers."""
+from io import BytesIO, RawIOBase
+from pathlib import Path
+from typing import Callable, IO
+
+import pytest
+
+from srctools.binformat import read_nullstr, read_nullstr_array, NULLSTR_CHUNK
+
+
+class NonSeekable(RawIOBase):
+    """A stream which can't seek, like a pipe."""
+    def __init__(self, data: bytes) -> None:
+        self._buf = BytesIO(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buf) -> int:
+        return self._buf.readinto(buf)
+
+
+# The different kinds of files to read from.
+OPENERS = ['bytesio', 'buffered', 'unbuffered', 'nonseekable']
+
+
+@pytest.fixture(params=OPENERS)
+def opener(request, tmp_path: Path) -> Callable[[bytes], IO[bytes]]:
+    """Produce a function which opens the data in the given way."""
+    def func(data: bytes) -> IO[bytes]:
+        if request.param == 'bytesio':
+            return BytesIO(data)
+        elif request.param == 'nonseekable':
+            return NonSeekable(data)
+        path = tmp_path / 'data.bin'
+        path.write_bytes(data)
+        if request.param == 'buffered':
+            return path.open('rb')
+        else:
+            return path.open('rb', buffering=0)
+    return func
+
+
+def test_nullstr_sequential(opener) -> None:
+    """Test reading consecutive strings."""
+    with opener(b'first\0\0second\0') as f:
+        assert read_nullstr(f) == 'first'
+        if f.seekable():
+            assert f.tell() == 6
+        assert read_nullstr(f) == ''
+        assert read_nullstr(f) == 'second'
+        assert f.read() == b''
+
+
+def test_nullstr_array(opener) -> None:
+    """Test read_nullstr_array()."""
+    with opener(b'a\0bc\0def\0rest') as f:
+        assert read_nullstr_array(f, 3) == ['a', 'bc', 'def']
+        assert f.read() == b'rest'
+
+
+@pytest.mark.parametrize('length', [
+    0, 1, NULLSTR_CHUNK - 2, NULLSTR_CHUNK - 1, NULLSTR_CHUNK,
+    NULLSTR_CHUNK + 1, 3 * NULLSTR_CHUNK + 5,
+])
+def test_nullstr_chunk_boundary(opener, length: int) -> None:
+    """Test strings ending around the size of the chunks that are read."""
+    text = bytes(ord('a') + i % 26 for i in range(length))
+    with opener(b'\x01\x02\x03' + text + b'\0after\0') as f:
+        f.read(3)
+        assert read_nullstr(f) == text.decode('ascii')
+        if f.seekable():
+            assert f.tell() == 3 + length + 1
+        assert read_nullstr(f) == 'after'
+
+
+def test_nullstr_pos() -> None:
+    """Passing a position seeks there first, with 0 meaning an empty string."""
+    f = BytesIO(b'\0\0abc\0de\0')
+    assert read_nullstr(f, 2) == 'abc'
+    assert f.tell() == 6
+    assert read_nullstr(f, 0) == ''
+    assert f.tell() == 6
+    assert read_nullstr(f, 3) == 'bc'
+
+
+def test_nullstr_encoding(opener) -> None:
+    """The encoding can be specified."""
+    with opener('Ünïcödé\0'.encode('utf8')) as f:
+        assert read_nullstr(f, encoding='utf8') == 'Ünïcödé'
+
+
+@pytest.mark.parametrize('data', [
+    b'', b'no terminator', b'x' * (2 * NULLSTR_CHUNK + 3),
+])
+def test_nullstr_eof(opener, data: bytes) -> None:
+    """Reaching the end of the file without a terminator is an error."""
+    with opener(data) as f:
+        with pytest.raises(ValueError):
+            read_nullstr(f)
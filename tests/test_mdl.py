@@ -0,0 +1,220 @@
+"""Test the model metadata parser.
+
+The synthetic model is produced by gen_test_mdl.py.
+"""
+from pathlib import Path
+import struct
+import weakref
+
+import pytest
+
+from srctools import Vec
+from srctools.filesys import RawFileSystem, VirtualFileSystem
+from srctools.mdl import AnimEvents, Flags, IncludedMDL, Model, SeqEvent, _map_file
+
+
+def load_virtual(datadir: Path, **extra: str) -> Model:
+    """Load the model from a VirtualFileSystem, along with extra files."""
+    fsys = VirtualFileSystem({
+        'models/synthetic.mdl': (datadir / 'synthetic.mdl').read_bytes(),
+        'models/synthetic.phy': (datadir / 'synthetic.phy').read_bytes(),
+        **extra,
+    })
+    return Model(fsys, fsys['models/synthetic.mdl'])
+
+
+def test_header(datadir: Path) -> None:
+    """Test the fixed values in the header."""
+    fsys = RawFileSystem(datadir)
+    mdl = Model(fsys, fsys['synthetic.mdl'])
+    assert mdl.version == 49
+    assert mdl.checksum == b'CHK1'
+    # Cut off at the first null.
+    assert mdl.name == 'models/test/thing.mdl'
+    assert mdl.eye_pos == Vec(0, 0.5, 1)
+    assert mdl.illum_pos == Vec(1.5, 2, 2.5)
+    assert mdl.hull_min == Vec(3, 3.5, 4)
+    assert mdl.hull_max == Vec(4.5, 5, 5.5)
+    assert mdl.view_min == Vec(6, 6.5, 7)
+    assert mdl.view_max == Vec(7.5, 8, 8.5)
+    assert mdl.flags == Flags.static_prop | Flags.autogenerated_hitbox
+    assert mdl.mass == 12.5
+    assert mdl.contents == 3
+    assert mdl.numAllowedRootLods == 3
+    assert mdl.surfaceprop == 'metal'
+    assert mdl.keyvalues == '"prop_data" { "base" "Metal.Small" }'
+    assert mdl.included_models == [
+        IncludedMDL('', 'models/a.mdl'),
+        IncludedMDL('lbl', 'models/b.mdl'),
+    ]
+
+
+def test_keyvalues_offset_zero(datadir: Path) -> None:
+    """An offset of zero means there are no keyvalues, even if a count is set."""
+    data = bytearray((datadir / 'synthetic.mdl').read_bytes())
+    # keyvalue_index, keyvalue_count
+    struct.pack_into('<II', data, 312, 0, 1)
+    fsys = VirtualFileSystem({'models/synthetic.mdl': bytes(data)})
+    mdl = Model(fsys, fsys['models/synthetic.mdl'])
+    assert mdl.keyvalues == ''
+
+
+def test_flags_setter(datadir: Path) -> None:
+    """Flags can be changed."""
+    mdl = load_virtual(datadir)
+    mdl.flags = Flags.translucent_twopass
+    assert mdl.flags is Flags.translucent_twopass
+
+
+def test_materials(datadir: Path) -> None:
+    """Test cdmaterials and the skin table."""
+    mdl = load_virtual(datadir)
+    # Normalised and deduplicated, with texture folders added after.
+    assert mdl.cdmaterials == ['models/props/', 'models/other/', 'models/third/', '']
+    # Only textures 0, 2 and 3 are used by the meshes.
+    assert mdl.skins == [
+        ['models/props/wood', 'models/third/glass', 'brick'],
+        ['models/props/wood2', 'models/props/wood', 'brick'],
+        ['extra', 'extra', 'brick'],
+    ]
+
+
+def test_sequences(datadir: Path) -> None:
+    """Test parsing sequences and their events."""
+    mdl = load_virtual(datadir)
+    assert [seq.label for seq in mdl.sequences] == ['idle', 'walk', 'empty']
+    idle, walk, empty = mdl.sequences
+
+    assert idle.act_name == 'ACT_IDLE'
+    assert idle.flags == 3
+    assert idle.act_weight == 0
+    assert idle.bbox_min == Vec(0, 1, 2)
+    assert idle.bbox_max == Vec(3, 4, 5)
+    assert idle.keyvalues == 'kv1'
+    assert idle.events == [
+        SeqEvent(AnimEvents.AE_CL_PLAYSOUND, pytest.approx(0.1), 'Snd.One'),
+        SeqEvent(AnimEvents.AE_CL_CREATE_PARTICLE_EFFECT, 0.5, 'opt'),
+        # Unknown names are kept as strings.
+        SeqEvent('CUSTOM_EVENT', pytest.approx(0.6), 'x'),
+        # Numeric names are looked up as indexes.
+        SeqEvent(AnimEvents.SCRIPT_EVENT_SOUND, pytest.approx(0.7), 'y'),
+    ]
+
+    assert walk.act_name == ''
+    assert walk.act_weight == 7
+    assert walk.keyvalues == ''
+    # Events with unknown indexes are skipped.
+    assert walk.events == [
+        SeqEvent(AnimEvents.AE_NPC_LEFTFOOT, pytest.approx(0.2), 'Combine'),
+        SeqEvent(AnimEvents.NPC_EVENT_SWISHSOUND, pytest.approx(0.3), 'swish'),
+    ]
+
+    assert empty.act_name == 'ACT_X'
+    assert empty.events == []
+
+
+def test_phy(datadir: Path) -> None:
+    """Test the physics keyvalues are read, and are optional."""
+    mdl = load_virtual(datadir)
+    assert [prop.value for prop in mdl.phys_keyvalues.find_all('break', 'model')] == ['models/gib.mdl']
+
+    fsys = VirtualFileSystem({
+        'models/synthetic.mdl': (datadir / 'synthetic.mdl').read_bytes(),
+    })
+    mdl = Model(fsys, fsys['models/synthetic.mdl'])
+    assert len(mdl.phys_keyvalues) == 0
+
+
+def test_filesystem_parity(datadir: Path) -> None:
+    """Real files are memory-mapped, others are read. Check both match."""
+    fsys = RawFileSystem(datadir)
+    raw = Model(fsys, fsys['synthetic.mdl'])
+    virt = load_virtual(datadir)
+    for attr in [
+        'version', 'checksum', 'name', 'flags', 'eye_pos', 'illum_pos',
+        'hull_min', 'hull_max', 'view_min', 'view_max', 'mass', 'contents',
+        'cdmaterials', 'skins', 'surfaceprop', 'keyvalues',
+        'included_models', 'sequences',
+    ]:
+        assert getattr(raw, attr) == getattr(virt, attr), attr
+    assert list(raw.phys_keyvalues.export()) == list(virt.phys_keyvalues.export())
+
+
+def test_map_file_offset(datadir: Path, tmp_path: Path) -> None:
+    """Files which don't start at the beginning of the stream are read, not mapped."""
+    model = (datadir / 'synthetic.mdl').read_bytes()
+    path = tmp_path / 'packed.bin'
+    path.write_bytes(b'header' + model)
+    with path.open('rb') as f:
+        with _map_file(f) as data:
+            assert bytes(data) == b'header' + model
+    with path.open('rb') as f:
+        f.seek(6)
+        with _map_file(f) as data:
+            assert bytes(data) == model
+
+
+def test_not_a_model() -> None:
+    """Invalid and empty files are rejected."""
+    fsys = VirtualFileSystem({'bad.mdl': b'IDSP' + bytes(400), 'empty.mdl': b''})
+    with pytest.raises(ValueError):
+        Model(fsys, fsys['bad.mdl'])
+    with pytest.raises(ValueError):
+        Model(fsys, fsys['empty.mdl'])
+
+
+def test_iter_textures(datadir: Path) -> None:
+    """Test locating textures in the filesystem."""
+    mdl = load_virtual(
+        datadir,
+        **{
+            'materials/models/props/wood.vmt': '',
+            'materials/models/props/metal.vmt': '',
+            'materials/models/third/glass.vmt': '',
+            'materials/brick.vmt': '',
+        }
+    )
+    expected = {
+        'materials/brick.vmt',
+        'materials/models/props/wood.vmt',
+        'materials/models/third/glass.vmt',
+    }
+    assert set(mdl.iter_textures()) == expected
+    assert set(mdl.iter_textures([1])) == {
+        'materials/brick.vmt',
+        'materials/models/props/wood.vmt',
+    }
+    # Invalid skins fall back to skin 0.
+    assert set(mdl.iter_textures([9])) == expected
+
+
+def test_iter_textures_edited(datadir: Path) -> None:
+    """Editing the skins or cdmaterials is reflected by iter_textures()."""
+    mdl = load_virtual(
+        datadir,
+        **{
+            'materials/models/a/b.vmt': '',
+            'materials/models/c.vmt': '',
+            'materials/other/tex.vmt': '',
+            'materials/brick.vmt': '',
+        }
+    )
+    assert set(mdl.iter_textures()) == {'materials/brick.vmt'}
+
+    # Paths are normalised like PurePosixPath, and extensions replaced.
+    mdl.cdmaterials = ['models//', 'other/.']
+    mdl.skins[0][:] = ['a//b', './c/', 'tex.vtf']
+    assert set(mdl.iter_textures()) == {
+        'materials/models/a/b.vmt',
+        'materials/models/c.vmt',
+        'materials/other/tex.vmt',
+    }
+    mdl.skins = [['brick']]
+    mdl.cdmaterials = ['']
+    assert set(mdl.iter_textures()) == {'materials/brick.vmt'}
+
+
+def test_weakref(datadir: Path) -> None:
+    """Models use slots, but can still be weakly referenced."""
+    mdl = load_virtual(datadir)
+    assert weakref.ref(mdl)() is mdl
@@ -0,0 +1,238 @@
+"""Test the soundscript parser."""
+import io
+import warnings
+
+import pytest
+
+from srctools import Property
+from srctools.sndscript import (
+    Sound, Channel, Level, Pitch, VOLUME, VOL_NORM,
+    split_float, join_float,
+)
+
+
+def parse(text: str) -> Sound:
+    """Parse a single soundscript."""
+    [snd] = Sound.parse(Property.parse(text)).values()
+    return snd
+
+
+def round_trip(snd: Sound) -> Sound:
+    """Export a sound, then parse it back in."""
+    buf = io.StringIO()
+    snd.export(buf)
+    return parse(buf.getvalue())
+
+
+def stack_text(stack: Property) -> str:
+    """Export a stack to compare."""
+    return ''.join(stack.export())
+
+
+def test_split_float() -> None:
+    """Test single values, pairs and named constants."""
+    names = {'PITCH_LOW': Pitch.PITCH_LOW}
+    assert split_float('45', names, 1.0, 'snd') == (45.0, 45.0)
+    assert split_float('4,5', names, 1.0, 'snd') == (4.0, 5.0)
+    assert split_float('pitch_low', names, 1.0, 'snd') == (Pitch.PITCH_LOW, Pitch.PITCH_LOW)
+    assert split_float('PITCH_LOW, 8', names, 1.0, 'snd') == (Pitch.PITCH_LOW, 8.0)
+    assert split_float('bad', names, 1.0, 'snd') == (1.0, 1.0)
+    with pytest.raises(ValueError):
+        split_float('1,2,3', names, 1.0, 'snd')
+
+    # Enums and converter functions can be passed too.
+    assert split_float('PITCH_LOW', Pitch.__getitem__, 100.0, 'snd') == (Pitch.PITCH_LOW, Pitch.PITCH_LOW)
+    assert split_float('pitch_low,bad', Pitch.__getitem__, 100.0, 'snd') == (Pitch.PITCH_LOW, 100.0)
+    assert split_float('vol_norm', VOLUME, 1.0, 'snd') == (VOL_NORM, VOL_NORM)
+    assert split_float('0.5', VOLUME, 1.0, 'snd') == (0.5, 0.5)
+    with pytest.raises(ValueError):
+        split_float('1,2,3', Pitch.__getitem__, 1.0, 'snd')
+
+    assert join_float((4.0, 4.0)) == '4.0'
+    assert join_float((Pitch.PITCH_LOW, 8.0)) == 'PITCH_LOW,8.0'
+
+
+def test_basic() -> None:
+    """Test parsing and exporting a regular sound."""
+    snd = parse('''
+    "Test.Sound"
+        {
+        "channel" "CHAN_WEAPON"
+        "volume" "0.75"
+        "pitch" "PITCH_HIGH"
+        "soundlevel" "SNDLVL_85dB"
+        "wave" "weapons/shoot.wav"
+        }
+    ''')
+    for snd in [snd, round_trip(snd)]:
+        assert snd.name == 'Test.Sound'
+        assert snd.sounds == ['weapons/shoot.wav']
+        assert snd.channel is Channel.GUNFIRE
+        assert snd.volume == (0.75, 0.75)
+        assert snd.pitch == (Pitch.PITCH_HIGH, Pitch.PITCH_HIGH)
+        assert snd.level == (Level.SNDLVL_85dB, Level.SNDLVL_85dB)
+        assert not snd.force_v2
+
+
+def test_defaults() -> None:
+    """Test the values used when options are missing."""
+    snd = parse('''
+    "Test.Defaults" {
+        "rndwave" {
+            "wave" "a.wav"
+            "wave" "b.wav"
+        }
+    }''')
+    for snd in [snd, round_trip(snd)]:
+        assert snd.sounds == ['a.wav', 'b.wav']
+        assert snd.channel is Channel.DEFAULT
+        assert snd.volume == (1.0, 1.0)
+        assert snd.pitch == (100.0, 100.0)
+        assert snd.level == (Level.SNDLVL_NORM, Level.SNDLVL_NORM)
+
+
+def test_named_values() -> None:
+    """Constants are matched case-insensitively."""
+    snd = parse('''
+    "Test.Named" {
+        "volume" "vol_norm"
+        "soundlevel" "sndlvl_85db"
+        "pitch" "pitch_low"
+        "wave" "a.wav"
+    }''')
+    assert snd.volume == (VOL_NORM, VOL_NORM)
+    assert snd.level == (Level.SNDLVL_85dB, Level.SNDLVL_85dB)
+    assert snd.pitch == (Pitch.PITCH_LOW, Pitch.PITCH_LOW)
+    snd = round_trip(snd)
+    assert snd.volume == (VOL_NORM, VOL_NORM)
+    assert snd.level == (Level.SNDLVL_85dB, Level.SNDLVL_85dB)
+    assert snd.pitch == (Pitch.PITCH_LOW, Pitch.PITCH_LOW)
+
+
+def test_attenuation() -> None:
+    """Attenuation is converted to a soundlevel, if soundlevel isn't present."""
+    snd = parse('''
+    "Test.Atten" {
+        "attenuation" "ATTN_NORM,0"
+        "wave" "a.wav"
+    }''')
+    assert snd.level == (75.0, 0.0)
+    snd = parse('''
+    "Test.Atten" {
+        "attenuation" "ATTN_STATIC"
+        "wave" "a.wav"
+    }''')
+    assert snd.level == (66.0, 66.0)
+    assert round_trip(snd).level == (66.0, 66.0)
+
+    snd = parse('''
+    "Test.Atten" {
+        "attenuation" "ATTN_NORM"
+        "soundlevel" "SNDLVL_GUNFIRE"
+        "wave" "a.wav"
+    }''')
+    assert snd.level == (Level.SNDLVL_GUNFIRE, Level.SNDLVL_GUNFIRE)
+
+
+def test_duplicate_keys() -> None:
+    """Later keys override earlier ones, like Property[key]."""
+    snd = parse('''
+    "Test.Dupe" {
+        "channel" "CHAN_VOICE"
+        "volume" "0.25"
+        "wave" "a.wav"
+        "channel" "CHAN_ITEM"
+        "volume" "0.5"
+    }''')
+    for snd in [snd, round_trip(snd)]:
+        assert snd.channel is Channel.ITEMS
+        assert snd.volume == (0.5, 0.5)
+        assert snd.sounds == ['a.wav']
+
+
+def test_block_options() -> None:
+    """Block options are ignored, with a warning if there's no value to use."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        snd = parse('''
+        "Test.Block" {
+            "volume" "0.3"
+            "volume" { "nested" "1" }
+            "wave" "a.wav"
+        }''')
+    assert snd.volume == (0.3, 0.3)
+    assert round_trip(snd).volume == (0.3, 0.3)
+
+    with pytest.warns(DeprecationWarning):
+        snd = parse('''
+        "Test.Block" {
+            "channel" { "nested" "CHAN_VOICE" }
+            "wave" "a.wav"
+        }''')
+    assert snd.channel is Channel.DEFAULT
+    assert round_trip(snd).channel is Channel.DEFAULT
+
+
+def test_unknown_channel() -> None:
+    """Invalid channels are an error."""
+    with pytest.raises(ValueError):
+        parse('''
+        "Test.Chan" {
+            "channel" "CHAN_NOPE"
+            "wave" "a.wav"
+        }''')
+
+
+def test_operator_stacks() -> None:
+    """Test operator stacks are read, and merged from multiple blocks."""
+    snd = parse('''
+    "Test.Stacks" {
+        "wave" "a.wav"
+        "soundentry_version" "2"
+        "operator_stacks" {
+            "start_stack" { "import_stack" "P2_exclusion_time_blocker_start" }
+            "update_stack" { "import_stack" "update_default" }
+        }
+        "operator_stacks" {
+            "start_stack" { "block_entries" { "operator" "sys_block_entries" } }
+            "unknown_stack" { "ignored" "1" }
+        }
+    }''')
+    assert snd.force_v2
+    assert snd._stack_stop is None
+    start = stack_text(snd.stack_start)
+    update = stack_text(snd.stack_update)
+    assert [prop.name for prop in snd.stack_start] == ['import_stack', 'block_entries']
+    assert [prop.value for prop in snd.stack_update] == ['update_default']
+
+    # Exporting doesn't modify the stacks.
+    copy = round_trip(snd)
+    assert stack_text(snd.stack_start) == start
+    assert stack_text(snd.stack_update) == update
+
+    assert copy.force_v2
+    assert copy._stack_stop is None
+    assert stack_text(copy.stack_start) == start
+    assert stack_text(copy.stack_update) == update
+
+
+def test_operator_stacks_leaf() -> None:
+    """A leaf operator_stacks keyvalue doesn't produce stacks."""
+    snd = parse('''
+    "Test.Stacks" {
+        "wave" "a.wav"
+        "soundentry_version" "2"
+        "operator_stacks" "nothing"
+    }''')
+    assert snd.force_v2
+    assert snd._stack_start is None
+    assert snd._stack_update is None
+    assert snd._stack_stop is None
+    assert round_trip(snd).force_v2
+
+
+def test_operator_stacks_version() -> None:
+    """Operator stacks require soundentry_version 2."""
+    for stacks in ['"nothing"', '{\n"start_stack"\n{\n"a" "b"\n}\n}']:
+        with pytest.raises(ValueError):
+            parse(f'"Test.Stacks"\n{{\n"wave" "a.wav"\n"operator_stacks" {stacks}\n}}')